@@ -1,7 +1,13 @@
-from fastapi import FastAPI
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
-from entrypoint import compose_email
-from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from entrypoint import draft, email_run, log_email
+from email_agent import wire
+from email_agent.admission import BULK, INTERACTIVE, Overloaded, pool_from_env
+from email_agent.session import DraftError, SessionStore, VersionConflict
+from fastapi.responses import JSONResponse, Response
 
 
 app = FastAPI()
@@ -28,20 +34,208 @@ class EmailRequest(BaseModel):
     sender_name: str = "Your Name"
     tone: str = "formal"
     language: str = "en"
+    polish: bool = False
+
+
+class SessionPatch(BaseModel):
+    patches: List[Dict[str, Any]]
+    version: Optional[int] = None
 
 
 app = FastAPI()
+sessions = SessionStore()
+
+# Admission pools: rule-based drafting, LLM-polished drafting and editing
+# sessions are limited separately (override via EMAIL_<POOL>_* env vars)
+pools = {
+    "rule": pool_from_env("rule", max_concurrent=32, max_queue=64, queue_timeout=2.0),
+    "llm": pool_from_env("llm", max_concurrent=4, max_queue=16, queue_timeout=10.0),
+    "session": pool_from_env("session", max_concurrent=32, max_queue=64, queue_timeout=1.0),
+}
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _priority(request: Request) -> str:
+    """
+    Callers mark batch traffic with `X-Request-Priority: bulk`.
+    """
+    value = request.headers.get("x-request-priority", INTERACTIVE).strip().lower()
+    return BULK if value == BULK else INTERACTIVE
+
+
+class _DecodedRequest(Request):
+    """
+    A request whose body has already been decoded; FastAPI sees it as JSON.
+    """
+
+    def __init__(self, request: Request, body: bytes, data: Any):
+        headers = [(k, v) for k, v in request.scope["headers"] if k != b"content-type"]
+        scope = {**request.scope, "headers": headers + [(b"content-type", wire.JSON.encode())]}
+        super().__init__(scope, request.receive)
+        self._raw, self._decoded = body, data
+
+    async def body(self) -> bytes:
+        return self._raw
+
+    async def json(self) -> Any:
+        return self._decoded
+
+
+async def _decode(request: Request) -> Request:
+    """
+    Decode the request body (JSON or MessagePack, per Content-Type).
+    """
+    body = await request.body()
+    if not body:
+        return request
+    try:
+        data = wire.decode_body(body, request.headers.get("content-type"))
+    except wire.UnsupportedMediaType as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed request body")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be an object")
+    if not all(isinstance(k, str) for k in data):
+        raise HTTPException(status_code=400, detail="Request body keys must be strings")
+    return _DecodedRequest(request, body, data)
+
+
+class WireRoute(APIRoute):
+    """
+    Route that accepts JSON or MessagePack bodies; the endpoint's pydantic
+    model validates them either way.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            if request.method in ("POST", "PUT", "PATCH"):
+                request = await _decode(request)
+            return await handler(request)
+
+        return route_handler
+
+
+app.router.route_class = WireRoute
+
+
+def _respond(request: Request, payload, status_code: int = 200) -> Response:
+    """
+    Encode `payload` as JSON or MessagePack, per the Accept header.
+    """
+    content, media_type = wire.encode(payload, request.headers.get("accept"))
+    return Response(content=content, status_code=status_code, media_type=media_type)
 
 
 @app.post("/draft_email")
-async def draft_email(req: EmailRequest):
-    result = compose_email(
-        bullets=req.bullets,
-        sender_name=req.sender_name,
-        tone=req.tone,
-        language=req.language,
+async def draft_email(req: EmailRequest, request: Request):
+    pool = pools["llm" if req.polish else "rule"]
+    async with pool.slot(_priority(request)):
+        subject, email = await run_in_threadpool(_compose, req)
+    return _respond(request, {"subject": subject, "email": email})
+
+
+def _compose(req: EmailRequest) -> Tuple[str, str]:
+    """
+    Draft (and optionally polish) one email, then log and print the text returned.
+    """
+    result, timings = draft(
+        req.bullets, sender_name=req.sender_name, tone=req.tone, language=req.language,
     )
-    return {"subject": result["subject"], "email": result["email"]}
+    subject, email = result["subject"], result["email"]
+    if req.polish:
+        email = _polish(subject, email)
+    with email_run():
+        full_email = log_email(
+            req.bullets, subject, email,
+            sender_name=req.sender_name, tone=req.tone, language=req.language, timings=timings,
+        )
+    print(full_email)
+    return subject, email
+
+
+def _polish(subject: str, email: str) -> str:
+    try:
+        from email_agent.llm import polish_email
+    except Exception:
+        # openai missing, or the client cannot be built (e.g. no API key):
+        # serve the rule-based draft rather than failing the request
+        return email
+
+    greeting, rest = email.split("\n\n", 1)
+    body, closing = rest.rsplit("\n\n", 1)
+    return polish_email(subject, greeting, body, closing)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """
+    Admission and load-shedding counters per pool.
+    """
+    return _respond(request, {"pools": {name: pool.snapshot() for name, pool in pools.items()}})
+
+
+@app.post("/sessions")
+async def create_session(req: EmailRequest, request: Request):
+    """
+    Start an interactive drafting session; returns its id and the full draft.
+    """
+    try:
+        async with pools["session"].slot(_priority(request)):
+            sid, session = await run_in_threadpool(
+                sessions.create,
+                req.bullets, sender_name=req.sender_name, tone=req.tone, language=req.language,
+            )
+    except DraftError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return _respond(request, {"session_id": sid, **session.render()}, status_code=201)
+
+
+def _get_session(sid: str):
+    session = sessions.get(sid)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return session
+
+
+@app.get("/sessions/{sid}")
+async def get_session(sid: str, request: Request):
+    return _respond(request, _get_session(sid).render())
+
+
+@app.patch("/sessions/{sid}")
+async def patch_session(sid: str, req: SessionPatch, request: Request):
+    """
+    Apply line patches to a session's bullets and return only what changed.
+    """
+    session = _get_session(sid)
+    try:
+        async with pools["session"].slot(_priority(request)):
+            delta = await run_in_threadpool(session.apply, req.patches, version=req.version)
+    except VersionConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except DraftError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return _respond(request, delta)
+
+
+@app.delete("/sessions/{sid}", status_code=204)
+async def delete_session(sid: str):
+    if not sessions.delete(sid):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return Response(status_code=204)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Make sure your project root is on the import path
+sys.path.append(os.getcwd())
+
+import httpx
+from fastapi import FastAPI
+
+import app as service
+from email_agent import wire
+from email_agent.agent import EmailDraftingAgent
+
+N = 3000
+WARMUP = 200
+
+
+def draft_only(bullets, sender_name, tone, language):
+    # Both routes draft the same way; MLflow logging and printing are left out
+    return EmailDraftingAgent()(bullets, sender_name=sender_name, tone=tone, language=language)
+
+
+def compose_only(req):
+    result = draft_only(req.bullets, req.sender_name, req.tone, req.language)
+    return result["subject"], result["email"]
+
+
+service._compose = compose_only
+
+# The /draft_email route as it was before content negotiation: FastAPI body
+# parsing and pydantic validation in, jsonable_encoder + JSONResponse out
+baseline = FastAPI()
+
+
+@baseline.post("/draft_email")
+async def baseline_draft_email(req: service.EmailRequest):
+    result = draft_only(
+        bullets=req.bullets,
+        sender_name=req.sender_name,
+        tone=req.tone,
+        language=req.language,
+    )
+    return {"subject": result["subject"], "email": result["email"]}
+
+
+with open("payload.json", encoding="utf-8") as fh:
+    payload = json.load(fh)
+json_body = json.dumps(payload).encode("utf-8")
+
+
+async def _inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+async def measure(app, body, media, inline=False):
+    """
+    Mean in-process latency of POST /draft_email through the full ASGI stack.
+    """
+    saved = service.run_in_threadpool
+    if inline:
+        # Isolates the wire format from the threadpool hop admission control adds
+        service.run_in_threadpool = _inline
+    headers = {"Content-Type": media, "Accept": media}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(WARMUP):
+                await client.post("/draft_email", content=body, headers=headers)
+            start = time.perf_counter()
+            for _ in range(N):
+                resp = await client.post("/draft_email", content=body, headers=headers)
+            assert resp.status_code == 200, resp.text
+            return (time.perf_counter() - start) / N * 1e6
+    finally:
+        service.run_in_threadpool = saved
+
+
+if __name__ == "__main__":
+    cases = [
+        ("baseline json", baseline, json_body, wire.JSON, False),
+        ("new json", service.app, json_body, wire.JSON, False),
+        ("new json*", service.app, json_body, wire.JSON, True),
+    ]
+    if wire.msgpack is not None:
+        packed = wire.msgpack.packb(payload)
+        cases += [
+            ("new msgpack", service.app, packed, wire.MSGPACK, False),
+            ("new msgpack*", service.app, packed, wire.MSGPACK, True),
+        ]
+
+    print(f"orjson: {'yes' if wire.orjson else 'no'}, msgpack: {'yes' if wire.msgpack else 'no'}")
+    first = None
+    for name, app, body, media, inline in cases:
+        per_call = asyncio.run(measure(app, body, media, inline))
+        first = first or per_call
+        print(f"{name:<14} {per_call:8.1f} us/request  ({first / per_call:.2f}x)")
+    print("* drafting called inline instead of through the threadpool")
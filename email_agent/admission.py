@@ -0,0 +1,166 @@
+# File: email_agent/admission.py
+"""
+Admission Control Module
+
+Concurrency limits with bounded wait queues for the drafting service. Each
+AdmissionPool admits up to `max_concurrent` requests at once and parks up to
+`max_queue` more; anything beyond that, or anything that waits longer than
+`queue_timeout`, is shed immediately with an `Overloaded` error carrying a
+Retry-After estimate, instead of letting latency grow until clients time out.
+
+Bulk requests only get a share of the queue and are admitted after any
+waiting interactive requests.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, pool: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{pool} pool overloaded ({reason})")
+        self.pool = pool
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionPool:
+    """
+    Concurrency limit plus a bounded, two-priority wait queue.
+
+    Bulk callers are shed with 429 (back off and retry later); interactive
+    callers are shed with 503. Shedding and admission counts are kept in
+    `metrics`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float = 2.0,
+        bulk_queue_share: float = 0.5,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.bulk_queue_limit = int(max_queue * bulk_queue_share)
+        self.active = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {INTERACTIVE: deque(), BULK: deque()}
+        # Exponentially weighted mean service time, for Retry-After estimates
+        self._service_time = 0.1
+        self.metrics: Dict[str, int] = {
+            "admitted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+            "shed_interactive": 0,
+            "shed_bulk": 0,
+        }
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters[INTERACTIVE]) + len(self._waiters[BULK])
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a slot is likely to free up, rounded up to at least 1.
+        """
+        backlog = self.queued + self.active
+        return max(1, math.ceil(backlog * self._service_time / max(1, self.max_concurrent)))
+
+    def _shed(self, priority: str, reason: str) -> Overloaded:
+        self.metrics[f"shed_{reason}"] += 1
+        self.metrics[f"shed_{priority}"] += 1
+        status = 429 if priority == BULK else 503
+        return Overloaded(self.name, status, self.retry_after(), reason)
+
+    async def _acquire(self, priority: str) -> None:
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.metrics["admitted"] += 1
+            return
+        limit = self.bulk_queue_limit if priority == BULK else self.max_queue
+        if self.queued >= limit:
+            raise self._shed(priority, "queue_full")
+
+        fut = asyncio.get_running_loop().create_future()
+        waiters = self._waiters[priority]
+        waiters.append(fut)
+        self.metrics["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self._release()
+            else:
+                fut.cancel()
+                waiters.remove(fut)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._shed(priority, "timeout")
+            raise
+        self.metrics["admitted"] += 1
+
+    def _release(self) -> None:
+        for priority in (INTERACTIVE, BULK):
+            waiters = self._waiters[priority]
+            while waiters:
+                fut = waiters.popleft()
+                if not fut.done():
+                    # Hand the slot straight to the next waiter
+                    fut.set_result(None)
+                    return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """
+        Hold one concurrency slot for the duration of the block.
+
+        Raises Overloaded if the request is shed.
+        """
+        await self._acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            **self.metrics,
+            "active": self.active,
+            "waiting": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+def pool_from_env(name: str, max_concurrent: int, max_queue: int, queue_timeout: float) -> AdmissionPool:
+    """
+    Build a pool whose limits can be overridden with EMAIL_<NAME>_MAX_CONCURRENT,
+    EMAIL_<NAME>_MAX_QUEUE, EMAIL_<NAME>_QUEUE_TIMEOUT and EMAIL_<NAME>_BULK_SHARE.
+    """
+    prefix = f"EMAIL_{name.upper()}_"
+    return AdmissionPool(
+        name,
+        max_concurrent=int(os.environ.get(prefix + "MAX_CONCURRENT", max_concurrent)),
+        max_queue=int(os.environ.get(prefix + "MAX_QUEUE", max_queue)),
+        queue_timeout=float(os.environ.get(prefix + "QUEUE_TIMEOUT", queue_timeout)),
+        bulk_queue_share=float(os.environ.get(prefix + "BULK_SHARE", 0.5)),
+    )
@@ -60,12 +60,61 @@ def _select_closing(tone: str, lang: str, sender: str) -> str:
     closing = (opts_es if lang.startswith('es') else opts_en).get(tone.lower(), 'Sincerely')
     return f"{closing},\n{sender}"
 
+def _truncate(value: str | list[str]) -> str | list[str]:
+    if isinstance(value, str) and len(value) > MAX_BULLET_LEN:
+        return value[:MAX_BULLET_LEN].rstrip() + '…'
+    if isinstance(value, list):
+        return [i[:MAX_BULLET_LEN].rstrip() + '…' if isinstance(i, str) and len(i) > MAX_BULLET_LEN else i for i in value]
+    return value
+
+def _build_subject(data: dict, tone: str) -> str:
+    raw = data.get('Purpose', '').strip().rstrip('.') or 'Update'
+    subject = rewrite_subject_segments(raw)
+    if tone.lower() == 'urgent':
+        subject = f"URGENT: {subject}"
+    return subject
+
+def _render_section(key: str, value: str | list[str], lang: str) -> list[str]:
+    if isinstance(value, str) and not value.strip():
+        return [f"• {key}"]
+    if isinstance(value, str) and value.endswith('…'):
+        return [f"• {value}"]
+    if isinstance(value, list):
+        return [f"• {rewrite_detail(i, lang)}" for i in value]
+    return [f"• {rewrite_detail(value, lang)}"]
+
+SKIPPED_KEYS = {'Recipient', 'Recipients', 'Purpose', 'Attachment', 'Attached'}
+
+def _assemble(greet: str, data: dict, sections: dict[str, list[str]], tone: str, lang: str, sender: str) -> str:
+    lines: list[str] = []
+    # Purpose
+    pur = data.get('Purpose', '').strip()
+    if pur:
+        lines.append(_rewrite_purpose_full(pur, tone, lang))
+    # Additional bullets
+    extras = [k for k in data.keys() if k not in SKIPPED_KEYS]
+    if pur and not extras:
+        lines.append(f"• {pur}")
+    for k in extras:
+        lines.extend(sections[k])
+    # Attachment
+    att = data.get('Attachment') or data.get('Attached')
+    if att:
+        lines.append(f"Please find the attached {att}.")
+    # Closing
+    close = _select_closing(tone, lang, sender)
+    return f"{greet}\n\n" + "\n\n".join(lines) + f"\n\n{close}"
+
+def _normalize_language(language: str) -> str:
+    lang = language.lower()
+    if not (lang.startswith('en') or lang.startswith('es')):
+        lang = 'en'
+    return lang
+
 class EmailDraftingAgent:
     def __call__(self, bullets: str, sender_name='Your Name', tone='formal', language='en') -> dict:
         # Normalize language
-        lang = language.lower()
-        if not (lang.startswith('en') or lang.startswith('es')):
-            lang = 'en'
+        lang = _normalize_language(language)
         # Empty guard
         if not bullets or not bullets.strip():
             subj = 'No content to send'
@@ -75,50 +124,13 @@ class EmailDraftingAgent:
             email = f"{greet}\n\n" + "\n\n".join(body) + f"\n\n{close}"
             return {'subject': subj, 'email': email}
         # Parse & truncate
-        data = _parse_bullets(bullets)
-        for k, v in list(data.items()):
-            if isinstance(v, str) and len(v) > MAX_BULLET_LEN:
-                data[k] = v[:MAX_BULLET_LEN].rstrip() + '…'
-            elif isinstance(v, list):
-                data[k] = [i[:MAX_BULLET_LEN].rstrip() + '…' if isinstance(i, str) and len(i) > MAX_BULLET_LEN else i for i in v]
+        data = {k: _truncate(v) for k, v in _parse_bullets(bullets).items()}
         # Subject
-        raw = data.get('Purpose', '').strip().rstrip('.') or 'Update'
-        subject = rewrite_subject_segments(raw)
-        if tone.lower() == 'urgent':
-            subject = f"URGENT: {subject}"
+        subject = _build_subject(data, tone)
         # Greeting
         rec = data.get('Recipient') or data.get('Recipients', '')
         greet = _make_greeting(rec, lang)
-        # Build body
-        lines: list[str] = []
-        # Purpose
-        pur = data.get('Purpose', '').strip()
-        if pur:
-            lines.append(_rewrite_purpose_full(pur, tone, lang))
-        # Additional bullets
-        skipped = {'Recipient', 'Recipients', 'Purpose', 'Attachment', 'Attached'}
-        extras = [k for k in data.keys() if k not in skipped]
-        if pur and not extras:
-            lines.append(f"• {pur}")
-        for k in extras:
-            v = data[k]
-            if isinstance(v, str) and not v.strip():
-                lines.append(f"• {k}")
-            elif isinstance(v, str) and v.endswith('…'):
-                lines.append(f"• {v}")
-            elif isinstance(v, list):
-                for i in v:
-                    lines.append(f"• {rewrite_detail(i, lang)}")
-            elif isinstance(v, str):
-                lines.append(f"• {rewrite_detail(v, lang)}")
-        # Attachment
-        att = data.get('Attachment') or data.get('Attached')
-        if att:
-            lines.append(f"Please find the attached {att}.")
-        # Closing
-        close = _select_closing(tone, lang, sender_name)
-        # Assemble
-        email = f"{greet}\n\n" + "\n\n".join(lines) + f"\n\n{close}"
+        # Body sections
+        sections = {k: _render_section(k, v, lang) for k, v in data.items() if k not in SKIPPED_KEYS}
+        email = _assemble(greet, data, sections, tone, lang, sender_name)
         return {'subject': subject, 'email': email}
-
-
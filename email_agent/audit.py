@@ -0,0 +1,340 @@
+# File: email_agent/audit.py
+"""
+Audit Store Module
+
+Append-only storage for drafted emails. Drafts are buffered as JSON lines in
+an open block, and each block of about 64 KiB is gzip-compressed as a single
+member of a size-rotated segment file. Compressing many similar drafts
+together is what makes the store compact; a small per-block index lets
+drafts be looked up by time range while decompressing only matching blocks.
+
+Layout under the store root:
+  segment-000001.jsonl.gz   concatenated gzip members, one per block
+  segment-000001.idx        JSON lines, one per block: {"offset", "length", "count", "first_ts", "last_ts"}
+  segment-000001.open       JSON lines of the block not yet compressed
+  manifest.jsonl            one line per sealed segment: {"seq", "first_ts", "last_ts"}
+  store.lock                exclusive lock held while appending
+
+Several processes may append to the same store: appends hold an exclusive
+`flock` on `store.lock`, and record ids are "<segment>-<block offset>-<position
+in block>", so they never depend on a process-local counter.
+
+Closed (rotated) segments can be shipped to MLflow as single artifacts with
+`export_to_mlflow`, instead of one `email.txt` artifact per draft.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_BLOCK_BYTES = 64 * 1024
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.jsonl\.gz$")
+
+
+def request_hash(bullets: str, sender_name: str, tone: str, language: str) -> str:
+    """
+    Stable SHA-256 fingerprint of the drafting inputs.
+    """
+    payload = json.dumps([bullets, sender_name, tone, language], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AuditStore:
+    """
+    Append-only, block-compressed, size-rotated store of drafted emails.
+
+    Record ids have the form "<segment>-<block>-<position>" (e.g.
+    "000003-000000004117-01532"): the segment number, the byte offset of the
+    record's block inside the segment, and the record's byte offset inside the
+    uncompressed block, so a lookup by id decompresses exactly one block.
+    Records in the open block are not compressed until it reaches
+    `block_bytes` or `flush` is called.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        block_bytes: int = DEFAULT_BLOCK_BYTES,
+    ):
+        self.root = root
+        self.max_segment_bytes = max_segment_bytes
+        self.block_bytes = block_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # Paths -----------------------------------------------------------------
+
+    def segment_path(self, seq: int) -> str:
+        return os.path.join(self.root, f"segment-{seq:06d}.jsonl.gz")
+
+    def index_path(self, seq: int) -> str:
+        return os.path.join(self.root, f"segment-{seq:06d}.idx")
+
+    def open_path(self, seq: int) -> str:
+        return os.path.join(self.root, f"segment-{seq:06d}.open")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, "manifest.jsonl")
+
+    def segment_seqs(self) -> List[int]:
+        """
+        Numbers of all segments on disk, sealed and active.
+        """
+        seqs = []
+        for name in os.listdir(self.root):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                seqs.append(int(m.group(1)))
+        return sorted(seqs)
+
+    def _read_index(self, seq: int) -> List[Dict]:
+        path = self.index_path(seq)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+    def _read_manifest(self) -> List[Dict]:
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, "r", encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+    def _active_seq(self, manifest: List[Dict]) -> int:
+        return manifest[-1]["seq"] + 1 if manifest else 1
+
+    def _read_open(self, seq: int) -> bytes:
+        try:
+            with open(self.open_path(seq), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return b""
+
+    @staticmethod
+    def _size(path: str) -> int:
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    # Writing ---------------------------------------------------------------
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """
+        Serialize appends across threads and, via flock, across processes.
+        """
+        with self._lock:
+            with open(os.path.join(self.root, "store.lock"), "a") as fh:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _flush_block(self, seq: int) -> None:
+        """
+        Compress the open block into one gzip member and index it.
+        """
+        data = self._read_open(seq)
+        if not data:
+            return
+        ts = [json.loads(line)["ts"] for line in data.splitlines()]
+        member = gzip.compress(data, mtime=0)
+        offset = self._size(self.segment_path(seq))
+        with open(self.segment_path(seq), "ab") as fh:
+            fh.write(member)
+        entry = {
+            "offset": offset, "length": len(member), "count": len(ts),
+            "first_ts": min(ts), "last_ts": max(ts),
+        }
+        with open(self.index_path(seq), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry) + "\n")
+        os.unlink(self.open_path(seq))
+
+    def _seal(self, seq: int) -> None:
+        entries = self._read_index(seq)
+        line = {
+            "seq": seq,
+            "first_ts": min((e["first_ts"] for e in entries), default=0.0),
+            "last_ts": max((e["last_ts"] for e in entries), default=0.0),
+        }
+        with open(self.manifest_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(line) + "\n")
+
+    def append(
+        self,
+        bullets: str,
+        subject: Optional[str],
+        email: Optional[str],
+        sender_name: str = "Your Name",
+        tone: str = "formal",
+        language: str = "en",
+        timings: Optional[Dict[str, float]] = None,
+    ) -> str:
+        """
+        Append one drafted email and return its record id.
+        """
+        record = {
+            "request_hash": request_hash(bullets, sender_name, tone, language),
+            "sender_name": sender_name,
+            "tone": tone,
+            "language": language,
+            "subject": subject,
+            "email": email,
+            "timings": timings or {},
+        }
+        with self._exclusive():
+            # Sequence, block and position are re-read under the lock, so
+            # concurrent writers in other processes are accounted for. The
+            # open block is always written at the current end of the segment.
+            seq = self._active_seq(self._read_manifest())
+            block = self._size(self.segment_path(seq))
+            position = self._size(self.open_path(seq))
+            record_id = f"{seq:06d}-{block:012d}-{position:05d}"
+            record["id"], record["ts"] = record_id, time.time()
+            line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+            with open(self.open_path(seq), "ab") as fh:
+                fh.write(line)
+            if position + len(line) >= self.block_bytes:
+                self._flush_block(seq)
+                if self._size(self.segment_path(seq)) >= self.max_segment_bytes:
+                    self._seal(seq)
+        return record_id
+
+    def flush(self) -> None:
+        """
+        Compress the open block now, e.g. before shutdown or export.
+        """
+        with self._exclusive():
+            self._flush_block(self._active_seq(self._read_manifest()))
+
+    # Reading ---------------------------------------------------------------
+
+    def _load_block(self, seq: int, offset: int, length: Optional[int] = None) -> bytes:
+        """
+        Decompress the single gzip member starting at `offset`.
+        """
+        decomp = zlib.decompressobj(wbits=31)
+        out = []
+        with open(self.segment_path(seq), "rb") as fh:
+            fh.seek(offset)
+            while not decomp.eof:
+                chunk = fh.read(length or 64 * 1024)
+                if not chunk:
+                    raise ValueError("truncated block")
+                out.append(decomp.decompress(chunk))
+        return b"".join(out)
+
+    @staticmethod
+    def _records(data: bytes) -> Iterator[Dict]:
+        for line in data.splitlines():
+            if line.strip():
+                yield json.loads(line.decode("utf-8"))
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        """
+        Look up a single draft by id; returns None if it does not exist.
+        """
+        try:
+            seq_str, block_str, position_str = record_id.split("-")
+            seq, block, position = int(seq_str), int(block_str), int(position_str)
+        except ValueError:
+            return None
+        with self._exclusive():
+            # The open block may be compressed by another writer at any time
+            size = self._size(self.segment_path(seq))
+            data = self._read_open(seq) if block == size else None
+        try:
+            if data is None:
+                if block >= size:
+                    return None
+                data = self._load_block(seq, block)
+            end = data.index(b"\n", position)
+            record = json.loads(data[position:end].decode("utf-8"))
+        except (zlib.error, ValueError):
+            return None
+        return record if isinstance(record, dict) and record.get("id") == record_id else None
+
+    def _active_blocks(self, seq: int) -> Tuple[List[Dict], bytes]:
+        # Index and open block are read together, so a concurrent flush
+        # cannot make a block show up twice or not at all
+        with self._exclusive():
+            return self._read_index(seq), self._read_open(seq)
+
+    def iter_range(self, start: float, end: float) -> Iterator[Dict]:
+        """
+        Yield drafts with start <= timestamp < end, in append order.
+
+        Sealed segments whose manifest time span misses the range are skipped
+        without reading their index, and blocks whose time span misses it are
+        not decompressed.
+        """
+        manifest = self._read_manifest()
+        seqs = [m["seq"] for m in manifest if m["last_ts"] >= start and m["first_ts"] < end]
+        active = self._active_seq(manifest)
+        for seq in seqs + [active]:
+            if seq == active:
+                blocks, pending = self._active_blocks(seq)
+            else:
+                blocks, pending = self._read_index(seq), b""
+            for block in blocks:
+                if block["last_ts"] >= start and block["first_ts"] < end:
+                    data = self._load_block(seq, block["offset"], block["length"])
+                    for record in self._records(data):
+                        if start <= record["ts"] < end:
+                            yield record
+            for record in self._records(pending):
+                if start <= record["ts"] < end:
+                    yield record
+
+    def sealed_segments(self) -> List[int]:
+        """
+        Segment numbers that have been rotated out and will not grow again.
+        """
+        return [m["seq"] for m in self._read_manifest()]
+
+
+def export_to_mlflow(
+    store: AuditStore, artifact_path: str = "audit", include_active: bool = False
+) -> List[int]:
+    """
+    Upload whole segments (and their indexes) to MLflow as single artifacts.
+
+    Only sealed segments are exported unless `include_active` is set, in which
+    case the open block is compressed first. Exported sealed segments are
+    marked with a `.exported` file so repeated runs skip them. Returns the
+    segment numbers uploaded by this call.
+    """
+    import mlflow
+
+    if include_active:
+        store.flush()
+    sealed = store.sealed_segments()
+    seqs = store.segment_seqs() if include_active else sealed
+    uploaded: List[int] = []
+    for seq in seqs:
+        marker = store.segment_path(seq) + ".exported"
+        if os.path.exists(marker):
+            continue
+        mlflow.log_artifact(store.segment_path(seq), artifact_path=artifact_path)
+        mlflow.log_artifact(store.index_path(seq), artifact_path=artifact_path)
+        if seq in sealed:
+            open(marker, "w").close()
+        uploaded.append(seq)
+    return uploaded
@@ -1,20 +1,39 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from openai import OpenAI, OpenAIError
 
 _client = OpenAI()
 
+# Bulk packing: the model must support JSON mode (response_format)
+BULK_MODEL = "gpt-4-turbo"
+PACK_TOKEN_BUDGET = 6000
+MIN_PACK_TOKEN_BUDGET = 1000
+MAX_PACK_SIZE = 20
+# Packs (and single-draft fallbacks) in flight at once
+MAX_CONCURRENCY = 4
 
-def polish_email(subject: str, greeting: str, body: str, closing: str) -> str:
+_BULK_PREAMBLE = (
+    "Turn each of the following drafts into a concise, professional email. "
+    "Polish every draft independently.\n"
+    'Respond with a JSON object of the form {"emails": [{"id": <draft id>, '
+    '"email": "<polished email>"}]}, with exactly one entry per draft.\n'
+)
+
+
+def _draft_text(subject: str, greeting: str, body: str, closing: str) -> str:
+    return f"Subject: {subject}\n{greeting}\n\n{body}\n\n{closing}\n"
+
+
+def polish_email(subject: str, greeting: str, body: str, closing: str, model: str = "gpt-4") -> str:
     prompt = (
         "Turn the following into a concise, professional email:\n"
-        f"Subject: {subject}\n"
-        f"{greeting}\n\n"
-        f"{body}\n\n"
-        f"{closing}\n"
+        + _draft_text(subject, greeting, body, closing)
     )
     try:
         resp = _client.chat.completions.create(
-            model="gpt-4",
+            model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
         )
@@ -22,3 +41,127 @@ def polish_email(subject: str, greeting: str, body: str, closing: str) -> str:
     except OpenAIError:
         # Fallback to rule-based
         return f"{greeting}\n\n{body}\n\n{closing}"
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough English average of four characters per token
+    return len(text) // 4 + 1
+
+
+def _pack_index(value: Any, size: int) -> Optional[int]:
+    # Models sometimes echo ids as strings ("0"); bools are not ids
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < size:
+        return value
+    return None
+
+
+def _polish_pack(drafts: List[Dict[str, str]]) -> Optional[Dict[int, str]]:
+    """
+    Polish several drafts in one request; returns the parsed emails by id.
+
+    Returns None if the request failed or the response was cut off, so the
+    caller can shrink later packs.
+    """
+    prompt = _BULK_PREAMBLE + "".join(
+        f"\n### Draft {i}\n{_draft_text(**d)}" for i, d in enumerate(drafts)
+    )
+    try:
+        resp = _client.chat.completions.create(
+            model=BULK_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+    except OpenAIError:
+        return None
+    choice = resp.choices[0]
+    if choice.finish_reason == "length":
+        return None
+    try:
+        items = json.loads(choice.message.content)["emails"]
+    except (ValueError, KeyError, TypeError):
+        return {}
+    polished: Dict[int, str] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        idx, email = _pack_index(item.get("id"), len(drafts)), item.get("email")
+        if idx is not None and isinstance(email, str) and email.strip():
+            polished.setdefault(idx, email.strip())
+    return polished
+
+
+def _next_pack(drafts: List[Dict[str, str]], queue: List[int], budget: int, max_pack_size: int) -> List[int]:
+    # Prompt and polished output are both roughly the size of the draft
+    pack: List[int] = []
+    used = _estimate_tokens(_BULK_PREAMBLE)
+    for i in queue[:max_pack_size]:
+        cost = 2 * _estimate_tokens(_draft_text(**drafts[i]))
+        if pack and used + cost > budget:
+            break
+        pack.append(i)
+        used += cost
+    return pack
+
+
+def polish_emails(
+    drafts: List[Dict[str, str]],
+    token_budget: int = PACK_TOKEN_BUDGET,
+    max_pack_size: int = MAX_PACK_SIZE,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> List[str]:
+    """
+    Polish many drafts, packing several into each chat completion.
+
+    Each draft is a dict with subject, greeting, body and closing, as taken by
+    `polish_email`. Drafts are packed greedily until their estimated prompt
+    plus completion tokens reach `token_budget`. Packs are sent in waves of up
+    to `max_concurrency` concurrent requests. If any pack in a wave fails or
+    is cut off, the budget is halved for the next wave and the failed packs'
+    drafts are queued again, to be re-packed at the smaller budget; only once
+    the budget is at its minimum are they polished one by one. A draft that
+    is merely missing from a parsed response is retried on its own through
+    `polish_email` (also concurrently, with the bulk model), which falls back
+    to the rule-based text. Results are returned in input order.
+    """
+    results: List[Optional[str]] = [None] * len(drafts)
+    budget = token_budget
+    width = max(1, max_concurrency)
+    queue = list(range(len(drafts)))
+
+    def send(pack: List[int]) -> Optional[Dict[int, str]]:
+        return {} if len(pack) == 1 else _polish_pack([drafts[i] for i in pack])
+
+    def single(i: int) -> str:
+        return polish_email(**drafts[i], model=BULK_MODEL)
+
+    with ThreadPoolExecutor(max_workers=width) as pool:
+        while queue:
+            packs: List[List[int]] = []
+            while queue and len(packs) < width:
+                packs.append(_next_pack(drafts, queue, budget, max_pack_size))
+                queue = queue[len(packs[-1]):]
+
+            requeue: List[int] = []
+            retry: List[int] = []
+            shrink = False
+            for pack, polished in zip(packs, pool.map(send, packs)):
+                if len(pack) > 1 and (polished is None or len(polished) < len(pack)):
+                    shrink = True
+                if polished is None and budget > MIN_PACK_TOKEN_BUDGET:
+                    requeue.extend(pack)
+                    continue
+                for j, i in enumerate(pack):
+                    text = (polished or {}).get(j)
+                    if text is None:
+                        retry.append(i)
+                    else:
+                        results[i] = text
+            if shrink:
+                budget = max(MIN_PACK_TOKEN_BUDGET, budget // 2)
+            queue = requeue + queue
+            for i, text in zip(retry, pool.map(single, retry)):
+                results[i] = text
+    return [r or "" for r in results]
@@ -0,0 +1,456 @@
+# File: email_agent/session.py
+"""
+Drafting Session Module
+
+Incremental re-drafting for interactive editors. A DraftSession keeps the
+bullet text split into sections (one per top-level '•' bullet), together
+with each section's parsed and rendered output. A batch of line patches is
+applied to the lines first, then each section it touched is re-parsed and
+re-rendered once; the subject is rebuilt only when Purpose changes. `apply`
+returns a delta of the rendered parts that changed instead of the whole
+email.
+
+Edits that leave the section structure alone (the usual keystroke case) are
+applied in place, with an undo log instead of copies, so their cost does not
+grow with the size of the draft. Adding or removing a bullet, or changing a
+bullet's key, re-assembles the draft from the per-section cache.
+"""
+
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from email_agent.agent import (
+    EmailDraftingAgent,
+    SKIPPED_KEYS,
+    _build_subject,
+    _make_greeting,
+    _normalize_language,
+    _parse_bullets,
+    _render_section,
+    _rewrite_purpose_full,
+    _select_closing,
+    _truncate,
+)
+
+# (parsed data, rendered part text per detail key); sections whose key is
+# overridden by a later bullet are never rendered
+Section = Tuple[dict, Optional[Dict[str, str]]]
+
+
+def _is_bullet(line: str) -> bool:
+    return line.strip().startswith("•")
+
+
+def _split_sections(lines: List[str]) -> Tuple[List[int], List[str]]:
+    """
+    Group lines into sections, each starting at a '•' bullet.
+
+    Returns the start line of each section and its text. Lines before the
+    first bullet are dropped, as `_parse_bullets` ignores them. Every section
+    but the last keeps a trailing newline, so that a blank last line inside it
+    still reaches `splitlines()` as a continuation line, just as it does when
+    the whole draft is parsed at once.
+    """
+    starts = [i for i, line in enumerate(lines) if _is_bullet(line)]
+    bounds = starts[1:] + [len(lines)]
+    texts = ["\n".join(lines[s:e]) + "\n" for s, e in zip(starts, bounds)]
+    if texts:
+        texts[-1] = texts[-1][:-1]
+    return starts, texts
+
+
+class VersionConflict(Exception):
+    """Raised when a patch is based on a stale session version."""
+
+    def __init__(self, current: int):
+        super().__init__(f"session is at version {current}")
+        self.current = current
+
+
+class DraftError(ValueError):
+    """Raised when the bullets cannot be rendered into a draft."""
+
+
+class DraftSession:
+    """
+    A bullet draft that can be patched line by line and re-rendered incrementally.
+
+    Rendered output is an ordered set of parts: "greeting", "purpose",
+    "section:<key>" for each detail bullet, "attachment" and "closing". The
+    email is these parts joined by blank lines, exactly as EmailDraftingAgent
+    renders it.
+    """
+
+    def __init__(self, bullets: str, sender_name: str = "Your Name", tone: str = "formal", language: str = "en"):
+        self.sender_name = sender_name
+        self.tone = tone
+        self.language = language
+        self.version = 0
+        self.lines: List[str] = bullets.splitlines()
+        self._lang = _normalize_language(language)
+        self._lock = threading.Lock()
+        self._starts: List[int] = []
+        self._texts: List[str] = []
+        self._sections: List[Section] = []
+        self._data: dict = {}
+        self._key_counts: Dict[str, int] = {}
+        self._has_extras = False
+        self._purpose: Optional[str] = None
+        self._recipient: Optional[str] = None
+        self._frame_ids: Tuple[List[str], List[str]] = ([], [])
+        self.subject = ""
+        self.parts: "OrderedDict[str, str]" = OrderedDict()
+        try:
+            self._rebuild()
+        except Exception as exc:
+            raise DraftError(f"cannot render draft: {exc}") from exc
+
+    # Rendering -------------------------------------------------------------
+
+    def _parse(self, text: str) -> dict:
+        return {k: _truncate(v) for k, v in _parse_bullets(text).items()}
+
+    def _render(self, data: dict) -> Dict[str, str]:
+        return {
+            k: "\n\n".join(_render_section(k, v, self._lang))
+            for k, v in data.items()
+            if k not in SKIPPED_KEYS
+        }
+
+    def _frame(self, data: dict, has_extras: bool) -> Tuple[str, str, List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        Subject, greeting and the body parts around the detail sections.
+
+        The subject is only rebuilt when Purpose changed; the greeting depends
+        on the time of day, so it is always rebuilt.
+        """
+        purpose = data.get("Purpose", "")
+        subject = self.subject if purpose == self._purpose else _build_subject(data, self.tone)
+        recipient = data.get("Recipient") or data.get("Recipients", "")
+        greeting = _make_greeting(recipient, self._lang)
+
+        head: List[Tuple[str, str]] = []
+        pur = purpose.strip()
+        if pur:
+            head.append(("purpose", _rewrite_purpose_full(pur, self.tone, self._lang)))
+            if not has_extras:
+                head.append(("section:Purpose", f"• {pur}"))
+        tail: List[Tuple[str, str]] = []
+        att = data.get("Attachment") or data.get("Attached")
+        if att:
+            tail.append(("attachment", f"Please find the attached {att}."))
+        if not head and not tail and not has_extras:
+            # Keep the agent's blank body paragraph when nothing else renders
+            tail.append(("body", ""))
+        return subject, greeting, head, tail
+
+    def _rebuild(self) -> None:
+        """
+        Re-assemble every part from the lines, reusing unchanged sections.
+        """
+        text = "\n".join(self.lines)
+        if not text.strip():
+            out = EmailDraftingAgent()(text, self.sender_name, self.tone, self.language)
+            greet, message, close = out["email"].split("\n\n")
+            self.subject = out["subject"]
+            self._starts, self._texts, self._sections = [], [], []
+            self._data, self._key_counts, self._has_extras = {}, {}, False
+            self._purpose = self._recipient = None
+            self._frame_ids = ([], [])
+            self.parts = OrderedDict([("greeting", greet), ("body", message), ("closing", close)])
+            return
+
+        reuse = dict(zip(self._texts, self._sections))
+        starts, texts = _split_sections(self.lines)
+        parsed = [reuse.get(t) or (self._parse(t), None) for t in texts]
+        # A bullet repeated later is overridden, as in the agent: only the
+        # last section holding a key is rendered
+        owner = {k: i for i, (section_data, _) in enumerate(parsed) for k in section_data}
+        sections: List[Section] = []
+        for i, (section_data, section_rendered) in enumerate(parsed):
+            if section_rendered is None and any(owner[k] == i for k in section_data):
+                section_rendered = self._render(section_data)
+            sections.append((section_data, section_rendered))
+        data: dict = {}
+        rendered: Dict[str, str] = {}
+        key_counts: Dict[str, int] = {}
+        for section_data, section_rendered in sections:
+            data.update(section_data)
+            rendered.update(section_rendered or {})
+            for k in section_data:
+                key_counts[k] = key_counts.get(k, 0) + 1
+        has_extras = bool(rendered)
+        subject, greeting, head, tail = self._frame(data, has_extras)
+
+        parts: "OrderedDict[str, str]" = OrderedDict()
+        parts["greeting"] = greeting
+        parts.update(head)
+        for k in data:
+            if k not in SKIPPED_KEYS:
+                parts[f"section:{k}"] = rendered[k]
+        parts.update(tail)
+        parts["closing"] = _select_closing(self.tone, self._lang, self.sender_name)
+
+        self._starts, self._texts, self._sections = starts, texts, sections
+        self._data, self._key_counts, self._has_extras = data, key_counts, has_extras
+        self._purpose, self.subject = data.get("Purpose", ""), subject
+        self._recipient = data.get("Recipient") or data.get("Recipients", "")
+        self._frame_ids = ([k for k, _ in head], [k for k, _ in tail])
+        self.parts = parts
+
+    def render(self) -> dict:
+        """
+        Full rendered output, matching EmailDraftingAgent's {subject, email}.
+        """
+        with self._lock:
+            # The greeting follows the time of day
+            self.parts["greeting"] = _make_greeting(self._recipient or "", self._lang)
+            return {
+                "version": self.version,
+                "subject": self.subject,
+                "email": "\n\n".join(self.parts.values()),
+                "parts": dict(self.parts),
+                "order": list(self.parts.keys()),
+            }
+
+    # Editing ---------------------------------------------------------------
+
+    def _check_patch(self, patch: dict) -> Tuple[str, int, str]:
+        op = patch.get("op")
+        line = patch.get("line")
+        text = patch.get("text", "")
+        if op == "delete" and text is None:
+            text = ""
+        if not isinstance(line, int) or isinstance(line, bool):
+            raise ValueError("patch 'line' must be an integer")
+        if not isinstance(text, str):
+            raise ValueError("patch 'text' must be a string")
+        if text.splitlines() not in ([], [text]):
+            raise ValueError("patch 'text' must be a single line")
+        if op == "insert":
+            if not 0 <= line <= len(self.lines):
+                raise ValueError(f"insert line {line} out of range")
+        elif op in ("replace", "delete"):
+            if not 0 <= line < len(self.lines):
+                raise ValueError(f"{op} line {line} out of range")
+        else:
+            raise ValueError(f"unknown patch op: {op!r}")
+        return op, line, text
+
+    def _apply_lines(self, op: str, line: int, text: str, undo: List[Callable[[], None]]) -> None:
+        lines = self.lines
+        if op == "insert":
+            lines.insert(line, text)
+            undo.append(lambda: lines.__delitem__(line))
+        elif op == "replace":
+            old = lines[line]
+            lines[line] = text
+            undo.append(lambda: lines.__setitem__(line, old))
+        else:
+            old = lines.pop(line)
+            undo.append(lambda: lines.insert(line, old))
+
+    def _apply_in_place(
+        self, patches: List[dict], undo: List[Callable[[], None]], before: Dict[str, str]
+    ) -> Optional[Set[str]]:
+        """
+        Apply a batch of patches, then re-render each touched section once.
+
+        All line edits are applied first, so sections are only ever rendered
+        from the final lines. Returns the ids of parts that changed, or None if
+        the batch altered the section structure, in which case the caller must
+        `_rebuild`; parts are only modified once that can no longer happen.
+        Changes are made in place and recorded in `undo`, and the prior value
+        of each changed part in `before`.
+        """
+        starts = self._starts
+        structural = not starts
+        dirty: Set[int] = set()
+        for patch in patches:
+            op, line, text = self._check_patch(patch)
+            if op == "insert":
+                touched, bullet = line - 1, _is_bullet(text)
+            elif op == "replace":
+                touched, bullet = line, _is_bullet(text) != _is_bullet(self.lines[line])
+            else:
+                touched, bullet = line, _is_bullet(self.lines[line])
+            self._apply_lines(op, line, text, undo)
+            structural = structural or bullet
+            if structural:
+                continue
+            i = bisect_right(starts, touched) - 1
+            shift = {"insert": 1, "delete": -1}.get(op, 0)
+            if shift:
+                starts[i + 1:] = [s + shift for s in starts[i + 1:]]
+                undo.append(lambda i=i, shift=shift: starts.__setitem__(
+                    slice(i + 1, None), [s - shift for s in starts[i + 1:]]
+                ))
+            if i >= 0:
+                # Text before the first bullet does not render
+                dirty.add(i)
+        if structural:
+            return None
+
+        lines, texts, sections = self.lines, self._texts, self._sections
+        updates: List[Tuple[int, str, dict]] = []
+        for i in sorted(dirty):
+            last = i == len(starts) - 1
+            end = len(lines) if last else starts[i + 1]
+            section_text = "\n".join(lines[starts[i]:end]) + ("" if last else "\n")
+            if section_text == texts[i]:
+                continue
+            section_data = self._parse(section_text)
+            if section_data.keys() != sections[i][0].keys() or any(self._key_counts[k] > 1 for k in section_data):
+                return None
+            updates.append((i, section_text, section_data))
+
+        data = self._data
+        new_parts: Dict[str, str] = {}
+        frame_changed = False
+        for i, section_text, section_data in updates:
+            old_text, old_section = texts[i], sections[i]
+            rendered = self._render(section_data)
+            texts[i], sections[i] = section_text, (section_data, rendered)
+            undo.append(lambda i=i, t=old_text, sec=old_section: (
+                texts.__setitem__(i, t), sections.__setitem__(i, sec)
+            ))
+            for k, v in section_data.items():
+                if v == old_section[0][k]:
+                    continue
+                old_value = data[k]
+                data[k] = v
+                undo.append(lambda k=k, old_value=old_value: data.__setitem__(k, old_value))
+                if k in SKIPPED_KEYS:
+                    frame_changed = True
+                else:
+                    new_parts[f"section:{k}"] = rendered[k]
+
+        subject = self.subject
+        if frame_changed:
+            subject, greeting, head, tail = self._frame(data, self._has_extras)
+            if ([k for k, _ in head], [k for k, _ in tail]) != self._frame_ids:
+                return None
+            new_parts.update(head)
+            new_parts.update(tail)
+        else:
+            greeting = _make_greeting(self._recipient or "", self._lang)
+        new_parts["greeting"] = greeting
+
+        parts = self.parts
+        for k, v in new_parts.items():
+            old = parts[k]
+            before.setdefault(k, old)
+            parts[k] = v
+            undo.append(lambda k=k, old=old: parts.__setitem__(k, old))
+        self._purpose, self.subject = data.get("Purpose", ""), subject
+        self._recipient = data.get("Recipient") or data.get("Recipients", "")
+        return set(new_parts)
+
+    def _state(self) -> tuple:
+        return (
+            self._starts, self._texts, self._sections, self._data, self._key_counts,
+            self._has_extras, self._frame_ids, self._purpose, self._recipient,
+            self.subject, self.parts,
+        )
+
+    def apply(self, patches: List[dict], version: Optional[int] = None) -> dict:
+        """
+        Apply line patches and return the delta of rendered output.
+
+        Each patch is {"op": "insert" | "replace" | "delete", "line": n, "text": ...}
+        with zero-based line numbers, applied in order. If `version` is given it
+        must match the session's current version. The delta contains the new
+        version, the subject if it changed, changed or added parts, removed part
+        ids, and the part order if it changed.
+
+        A failing patch leaves the session untouched: invalid patches raise
+        ValueError, and bullets the agent cannot render raise DraftError.
+        """
+        with self._lock:
+            if version is not None and version != self.version:
+                raise VersionConflict(self.version)
+            saved = self._state()
+            old_subject, old_parts = self.subject, self.parts
+            undo: List[Callable[[], None]] = []
+            before: Dict[str, str] = {}
+            try:
+                changed = self._apply_in_place(patches, undo, before)
+                if changed is None:
+                    self._rebuild()
+            except Exception as exc:
+                for fn in reversed(undo):
+                    fn()
+                (
+                    self._starts, self._texts, self._sections, self._data, self._key_counts,
+                    self._has_extras, self._frame_ids, self._purpose, self._recipient,
+                    self.subject, self.parts,
+                ) = saved
+                if isinstance(exc, ValueError):
+                    raise
+                raise DraftError(f"cannot render draft: {exc}") from exc
+            self.version += 1
+
+            delta: dict = {"version": self.version}
+            if self.subject != old_subject:
+                delta["subject"] = self.subject
+            if changed is not None:
+                parts = {k: self.parts[k] for k in changed if self.parts[k] != before[k]}
+            else:
+                parts = {k: v for k, v in self.parts.items() if old_parts.get(k) != v}
+            if parts:
+                delta["parts"] = parts
+            if changed is None:
+                removed = [k for k in old_parts if k not in self.parts]
+                if removed:
+                    delta["removed"] = removed
+                if list(self.parts.keys()) != list(old_parts.keys()):
+                    delta["order"] = list(self.parts.keys())
+            return delta
+
+
+class SessionStore:
+    """
+    In-memory store of drafting sessions, bounded by count and idle time.
+    """
+
+    def __init__(self, max_sessions: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Tuple[float, DraftSession]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            sid, (touched, _) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - touched > self.ttl_seconds:
+                del self._sessions[sid]
+            else:
+                break
+
+    def create(self, bullets: str, sender_name: str = "Your Name", tone: str = "formal", language: str = "en") -> Tuple[str, DraftSession]:
+        session = DraftSession(bullets, sender_name=sender_name, tone=tone, language=language)
+        sid = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[sid] = (now, session)
+            self._evict(now)
+        return sid, session
+
+    def get(self, sid: str) -> Optional[DraftSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            self._sessions[sid] = (now, entry[1])
+            self._sessions.move_to_end(sid)
+            return entry[1]
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(sid, None) is not None
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from email_agent.admission import BULK, INTERACTIVE, AdmissionPool, Overloaded
+
+
+async def _hold(pool, priority, gate, order, tag):
+    async with pool.slot(priority):
+        order.append(tag)
+        await gate.wait()
+
+
+def test_queue_full_is_shed_fast():
+    async def scenario():
+        pool = AdmissionPool("rule", max_concurrent=1, max_queue=1, queue_timeout=5)
+        gate = asyncio.Event()
+        order = []
+        first = asyncio.create_task(_hold(pool, INTERACTIVE, gate, order, "a"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_hold(pool, INTERACTIVE, gate, order, "b"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as info:
+            async with pool.slot(INTERACTIVE):
+                pass
+        gate.set()
+        await asyncio.gather(first, second)
+        return pool, info.value, order
+
+    pool, exc, order = asyncio.run(scenario())
+    assert exc.status_code == 503 and exc.retry_after >= 1
+    assert order == ["a", "b"]
+    assert pool.metrics["shed_queue_full"] == 1 and pool.metrics["admitted"] == 2
+    assert pool.active == 0 and pool.queued == 0
+
+
+def test_queue_timeout_and_bulk_status():
+    async def scenario():
+        pool = AdmissionPool("llm", max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(pool, INTERACTIVE, gate, [], "a"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as info:
+            async with pool.slot(BULK):
+                pass
+        gate.set()
+        await holder
+        return pool, info.value
+
+    pool, exc = asyncio.run(scenario())
+    assert exc.status_code == 429 and exc.reason == "timeout"
+    assert pool.metrics["shed_bulk"] == 1
+    assert pool.active == 0 and pool.queued == 0
+
+
+def test_interactive_waiters_go_before_bulk():
+    async def scenario():
+        pool = AdmissionPool("rule", max_concurrent=1, max_queue=4, queue_timeout=5)
+        gate = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(_hold(pool, INTERACTIVE, gate, order, "first"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_hold(pool, BULK, gate, order, "bulk")))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_hold(pool, INTERACTIVE, gate, order, "interactive")))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "interactive", "bulk"]
+
+
+def test_bulk_gets_only_a_share_of_the_queue():
+    async def scenario():
+        pool = AdmissionPool("rule", max_concurrent=1, max_queue=2, queue_timeout=5)
+        gate = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(pool, INTERACTIVE, gate, [], "a"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_hold(pool, BULK, gate, [], "b")))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            async with pool.slot(BULK):
+                pass
+        # Interactive traffic can still use the rest of the queue
+        tasks.append(asyncio.create_task(_hold(pool, INTERACTIVE, gate, [], "c")))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.metrics["shed_bulk"] == 1 and pool.metrics["admitted"] == 3
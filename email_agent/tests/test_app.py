@@ -0,0 +1,96 @@
+import importlib
+import sys
+import types
+from contextlib import nullcontext
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    try:
+        import mlflow  # noqa: F401
+    except ImportError:
+        monkeypatch.setitem(sys.modules, "mlflow", types.ModuleType("mlflow"))
+    module = importlib.import_module("app")
+    module.logged = []
+    monkeypatch.setattr(
+        module, "draft",
+        lambda bullets, sender_name, tone, language: (
+            {"subject": f"{tone} {language}", "email": f"Hello,\n\n{bullets}\n\n{sender_name}"},
+            {"draft_ms": 1.0},
+        ),
+    )
+    monkeypatch.setattr(module, "email_run", nullcontext)
+    monkeypatch.setattr(
+        module, "log_email",
+        lambda bullets, subject, email, **kw: module.logged.append(email) or email,
+    )
+    return module
+
+
+def test_json_draft(service):
+    client = TestClient(service.app)
+    resp = client.post("/draft_email", json={"bullets": "• Purpose: Sync", "tone": "friendly"})
+    assert resp.status_code == 200
+    assert resp.json()["subject"] == "friendly en"
+
+
+def test_msgpack_draft(service):
+    msgpack = pytest.importorskip("msgpack")
+    client = TestClient(service.app)
+    body = msgpack.packb({"bullets": "• Purpose: Sync", "language": "es"})
+    resp = client.post(
+        "/draft_email", content=body,
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(resp.content)["subject"] == "formal es"
+
+
+def test_bad_bodies_are_client_errors(service):
+    client = TestClient(service.app)
+    assert client.post("/draft_email", content=b"{", headers={"Content-Type": "application/json"}).status_code == 400
+    assert client.post("/draft_email", json=["x"]).status_code == 400
+    assert client.post("/draft_email", json={"tone": "formal"}).status_code == 422
+    assert client.post("/draft_email", content=b"x", headers={"Content-Type": "text/plain"}).status_code == 415
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.packb({b"bullets": "• Purpose: Sync"}, use_bin_type=True)
+    resp = client.post("/draft_email", content=body, headers={"Content-Type": "application/msgpack"})
+    assert resp.status_code == 400
+
+
+def test_polish_logs_the_returned_email(service, monkeypatch):
+    fake = types.ModuleType("email_agent.llm")
+    fake.polish_email = lambda subject, greeting, body, closing: f"Polished: {body}"
+    monkeypatch.setitem(sys.modules, "email_agent.llm", fake)
+    client = TestClient(service.app)
+    resp = client.post("/draft_email", json={"bullets": "• Purpose: Sync", "polish": True})
+    assert resp.json()["email"] == "Polished: • Purpose: Sync"
+    assert service.logged == ["Polished: • Purpose: Sync"]
+
+
+def test_polish_without_llm_client_returns_draft(service, monkeypatch):
+    # A None entry makes the import fail, as it does when OpenAI() cannot be built
+    monkeypatch.setitem(sys.modules, "email_agent.llm", None)
+    client = TestClient(service.app)
+    resp = client.post("/draft_email", json={"bullets": "• Purpose: Sync", "polish": True})
+    assert resp.status_code == 200
+    assert resp.json()["email"] == "Hello,\n\n• Purpose: Sync\n\nYour Name"
+    assert service.logged == [resp.json()["email"]]
+
+
+def test_session_errors_are_client_errors(service):
+    client = TestClient(service.app)
+    assert client.post("/sessions", json={"bullets": "• Purpose: Sync\n  - item"}).status_code == 422
+    sid = client.post("/sessions", json={"bullets": "• Purpose: Sync"}).json()["session_id"]
+    patch = {"patches": [{"op": "insert", "line": 1, "text": "  - item"}]}
+    assert client.patch(f"/sessions/{sid}", json=patch).status_code == 422
+    patch = {"patches": [{"op": "insert", "line": 1, "text": "  - item"}, {"op": "replace", "line": 1, "text": "• Changes: x"}]}
+    resp = client.patch(f"/sessions/{sid}", json=patch)
+    assert resp.status_code == 200 and resp.json()["version"] == 1
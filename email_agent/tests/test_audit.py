@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import sys
+import time
+import types
+
+from email_agent.audit import AuditStore, export_to_mlflow, request_hash
+
+
+def test_append_and_get_roundtrip(tmp_path):
+    store = AuditStore(str(tmp_path))
+    rid = store.append(
+        "• Purpose: Sync", "Sync", "Hello,\n\nBody", tone="friendly", language="es",
+        timings={"draft_ms": 1.5},
+    )
+    rec = store.get(rid)
+    assert rec["id"] == rid
+    assert rec["subject"] == "Sync"
+    assert rec["tone"] == "friendly" and rec["language"] == "es"
+    assert rec["timings"] == {"draft_ms": 1.5}
+    assert rec["request_hash"] == request_hash("• Purpose: Sync", "Your Name", "friendly", "es")
+    assert store.get("000001-000000000000-00001") is None
+    assert store.get("000001-000099999999-00000") is None
+    assert store.get("bogus") is None
+    store.flush()
+    assert store.get(rid) == rec
+    assert not os.path.exists(store.open_path(1))
+
+
+def test_segments_rotate_by_size_and_stay_readable(tmp_path):
+    store = AuditStore(str(tmp_path), max_segment_bytes=200, block_bytes=1)
+    ids = [store.append(f"b{i}", f"S{i}", "x" * 100) for i in range(6)]
+    assert len(store.sealed_segments()) >= 2
+    for i, rid in enumerate(ids):
+        assert store.get(rid)["subject"] == f"S{i}"
+    # A whole segment is still a valid multi-member gzip stream
+    with gzip.open(store.segment_path(1), "rb") as fh:
+        assert fh.read().count(b'"id"') >= 1
+
+
+def test_stores_sharing_a_directory_hand_out_distinct_ids(tmp_path):
+    first, second = AuditStore(str(tmp_path)), AuditStore(str(tmp_path))
+    a = first.append("a", "A", "x")
+    b = second.append("b", "B", "y")
+    c = first.append("c", "C", "z")
+    assert len({a, b, c}) == 3
+    assert [first.get(i)["subject"] for i in (a, b, c)] == ["A", "B", "C"]
+
+
+def test_blocks_compress_many_drafts_together(tmp_path):
+    with open(os.path.join(os.path.dirname(__file__), "..", "..", "payload.json"), encoding="utf-8") as fh:
+        payload = json.load(fh)
+    store = AuditStore(str(tmp_path))
+    body = "Hello,\n\n" + payload["bullets"] + "\n\nSincerely,\nAna"
+    ids = [store.append(payload["bullets"] + str(i), "Subject", body, timings={"draft_ms": i / 7}) for i in range(2000)]
+    store.flush()
+    on_disk = sum(os.path.getsize(os.path.join(str(tmp_path), n)) for n in os.listdir(str(tmp_path)))
+    assert on_disk / len(ids) < 200
+    assert store.get(ids[1234])["timings"] == {"draft_ms": 1234 / 7}
+    assert len(list(store.iter_range(0, float("inf")))) == 2000
+
+
+def test_iter_range_skips_sealed_segments_outside_range(tmp_path, monkeypatch):
+    store = AuditStore(str(tmp_path), max_segment_bytes=150, block_bytes=1)
+    store.append("a", "A", "x" * 100)
+    time.sleep(0.01)
+    cutoff = time.time()
+    store.append("b", "B", "y" * 100)
+    store.append("c", "C", "z" * 100)
+    read = []
+    original = store._read_index
+    monkeypatch.setattr(store, "_read_index", lambda seq: read.append(seq) or original(seq))
+    subjects = [r["subject"] for r in store.iter_range(cutoff, time.time() + 1)]
+    assert subjects == ["B", "C"]
+    assert 1 not in read
+
+
+def test_export_to_mlflow_uploads_sealed_segments_once(tmp_path, monkeypatch):
+    logged = []
+    stub = types.ModuleType("mlflow")
+    stub.log_artifact = lambda path, artifact_path=None: logged.append((os.path.basename(path), artifact_path))
+    monkeypatch.setitem(sys.modules, "mlflow", stub)
+
+    store = AuditStore(str(tmp_path), max_segment_bytes=150, block_bytes=1)
+    for i in range(3):
+        store.append(f"b{i}", f"S{i}", "x" * 100)
+    sealed = store.sealed_segments()
+    assert export_to_mlflow(store) == sealed
+    assert ("segment-000001.jsonl.gz", "audit") in logged
+    assert ("segment-000001.idx", "audit") in logged
+    assert export_to_mlflow(store) == []
+    # The open block of the active segment is compressed before export
+    store.block_bytes = 64 * 1024
+    rid = store.append("tail", "T", "x")
+    active = int(rid.split("-")[0])
+    assert export_to_mlflow(store, include_active=True) == [active]
+    assert store.get(rid)["subject"] == "T"
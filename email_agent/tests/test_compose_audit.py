@@ -0,0 +1,78 @@
+import importlib
+import sys
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import worker
+from email_agent.audit import AuditStore
+
+
+@pytest.fixture
+def entrypoint(monkeypatch):
+    logged = []
+    runs = threading.local()
+    stub = types.ModuleType("mlflow")
+
+    class Run:
+        # Like MLflow, the active run is tracked per thread
+        def __enter__(self):
+            runs.active = len(stub.started)
+            stub.started.append(False)
+
+        def __exit__(self, *exc):
+            stub.started[runs.active] = True
+            runs.active = None
+
+    stub.started = []
+    stub.active_run = lambda: getattr(runs, "active", None)
+    stub.start_run = Run
+    stub.log_text = lambda text, name: logged.append((name, text, stub.active_run()))
+    monkeypatch.setitem(sys.modules, "mlflow", stub)
+    monkeypatch.delitem(sys.modules, "entrypoint", raising=False)
+    module = importlib.import_module("entrypoint")
+    module.logged = logged
+    yield module
+    sys.modules.pop("entrypoint", None)
+
+
+def test_compose_email_logs_artifact_without_audit_dir(entrypoint, monkeypatch):
+    monkeypatch.delenv("EMAIL_AUDIT_DIR", raising=False)
+    entrypoint.compose_email("• Recipient: Jo\n• Purpose: Sync")
+    assert [name for name, _, _ in entrypoint.logged] == ["email.txt"]
+
+
+def test_each_email_gets_its_own_ended_run_across_threads(entrypoint, monkeypatch):
+    monkeypatch.delenv("EMAIL_AUDIT_DIR", raising=False)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda i: worker._draft({"bullets": f"• Purpose: Sync {i}"}), range(6)))
+    mlflow = sys.modules["mlflow"]
+    assert sorted(run for _, _, run in entrypoint.logged) == list(range(6))
+    assert mlflow.started == [True] * 6
+
+
+def test_email_run_reuses_active_run_and_skips_audit_store(entrypoint, monkeypatch, tmp_path):
+    monkeypatch.delenv("EMAIL_AUDIT_DIR", raising=False)
+    mlflow = sys.modules["mlflow"]
+    with mlflow.start_run():
+        for _ in range(2):
+            with entrypoint.email_run():
+                entrypoint.draft_and_log("• Purpose: Sync")
+    assert [run for _, _, run in entrypoint.logged] == [0, 0]
+    monkeypatch.setenv("EMAIL_AUDIT_DIR", str(tmp_path))
+    with entrypoint.email_run():
+        entrypoint.draft_and_log("• Purpose: Sync")
+    assert mlflow.started == [True]
+
+
+def test_compose_email_prefers_audit_store(entrypoint, monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_AUDIT_DIR", str(tmp_path))
+    result = entrypoint.compose_email("• Recipient: Jo\n• Purpose: Sync", tone="friendly")
+    assert entrypoint.logged == []
+    records = list(AuditStore(str(tmp_path)).iter_range(0, float("inf")))
+    assert len(records) == 1
+    assert records[0]["subject"] == result["subject"]
+    assert records[0]["tone"] == "friendly"
+    assert "draft_ms" in records[0]["timings"]
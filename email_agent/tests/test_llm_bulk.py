@@ -0,0 +1,134 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+from email_agent import llm  # noqa: E402
+
+
+def _draft(i, body="Body"):
+    return {"subject": f"S{i}", "greeting": f"Hello {i},", "body": body, "closing": "Thanks,\nAna"}
+
+
+class FakeCompletions:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def create(self, model, messages, temperature, response_format=None):
+        call = {"model": model, "prompt": messages[0]["content"], "json": response_format}
+        self.calls.append(call)
+        content, finish = self.reply(call)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish)])
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(reply):
+        completions = FakeCompletions(reply)
+        monkeypatch.setattr(llm, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+
+    return install
+
+
+def _echo_all(call):
+    if call["json"] is None:
+        return "single", "stop"
+    n = call["prompt"].count("### Draft ")
+    return json.dumps({"emails": [{"id": i, "email": f"polished {i}"} for i in range(n)]}), "stop"
+
+
+def test_drafts_are_packed_into_one_request(fake):
+    completions = fake(_echo_all)
+    out = llm.polish_emails([_draft(i) for i in range(5)])
+    assert out == [f"polished {i}" for i in range(5)]
+    assert len(completions.calls) == 1
+    assert completions.calls[0]["json"] == {"type": "json_object"}
+
+
+def test_pack_size_follows_token_budget(fake):
+    completions = fake(_echo_all)
+    drafts = [_draft(i, body="x" * 400) for i in range(6)]
+    llm.polish_emails(drafts, token_budget=700)
+    assert len(completions.calls) == 3
+
+
+def test_missing_or_bad_entries_fall_back_individually(fake):
+    def reply(call):
+        if call["json"] is None:
+            return "single", "stop"
+        return json.dumps({"emails": [{"id": 0, "email": "polished 0"}, {"id": 2, "email": ""}]}), "stop"
+
+    completions = fake(reply)
+    out = llm.polish_emails([_draft(i) for i in range(3)])
+    assert out == ["polished 0", "single", "single"]
+    assert len(completions.calls) == 3
+
+
+def test_truncated_pack_is_repacked_at_smaller_budget(fake):
+    def reply(call):
+        if call["json"] is None:
+            return "single", "stop"
+        if call["prompt"].count("### Draft ") > 4:
+            return "{", "length"
+        return _echo_all(call)
+
+    completions = fake(reply)
+    drafts = [_draft(i, body="x" * 400) for i in range(12)]
+    # One pack per wave, so every later pack sees the shrunken budget
+    out = llm.polish_emails(drafts, token_budget=2000, max_concurrency=1)
+    assert "single" not in out
+    packs = [c["prompt"].count("### Draft ") for c in completions.calls]
+    assert all(c["json"] for c in completions.calls)
+    assert packs[0] > 4 and max(packs[1:]) <= 4
+    assert len(completions.calls) < len(drafts)
+
+
+def test_failing_packs_at_minimum_budget_fall_back_to_bulk_model(fake):
+    def reply(call):
+        if call["json"] is None:
+            return "single", "stop"
+        return "{", "length"
+
+    completions = fake(reply)
+    drafts = [_draft(i, body="x" * 400) for i in range(12)]
+    out = llm.polish_emails(drafts, token_budget=2000, max_concurrency=1)
+    assert out == ["single"] * 12
+    assert {c["model"] for c in completions.calls} == {llm.BULK_MODEL}
+
+
+def test_numeric_string_ids_are_accepted(fake):
+    def reply(call):
+        if call["json"] is None:
+            return "single", "stop"
+        n = call["prompt"].count("### Draft ")
+        return json.dumps({"emails": [{"id": str(i), "email": f"polished {i}"} for i in range(n)]}), "stop"
+
+    completions = fake(reply)
+    out = llm.polish_emails([_draft(i) for i in range(40)])
+    assert out == [f"polished {i % 20}" for i in range(40)]
+    assert len(completions.calls) == 2
+    assert llm._pack_index(True, 3) is None and llm._pack_index(" 2", 3) == 2
+
+
+def test_packs_are_sent_concurrently(fake):
+    import threading
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def reply(call):
+        if call["json"] is not None:
+            # Only returns once three packs are in flight together
+            barrier.wait()
+        return _echo_all(call)
+
+    completions = fake(reply)
+    drafts = [_draft(i, body="x" * 400) for i in range(6)]
+    out = llm.polish_emails(drafts, token_budget=700, max_concurrency=3)
+    assert out == [f"polished {i % 2}" for i in range(6)]
+    assert len(completions.calls) == 3
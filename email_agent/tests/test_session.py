@@ -0,0 +1,152 @@
+import pytest
+
+from email_agent.agent import EmailDraftingAgent
+from email_agent.session import DraftError, DraftSession, SessionStore, VersionConflict
+
+BULLETS = """\
+• Recipient: Taylor
+• Purpose: Project update
+• Changes:
+  - Completed module A
+  - Started module B
+• Deadline: Friday"""
+
+
+def _expected(session):
+    return EmailDraftingAgent()(
+        "\n".join(session.lines), session.sender_name, session.tone, session.language
+    )
+
+
+def test_initial_render_matches_agent():
+    session = DraftSession(BULLETS, sender_name="Ana", tone="friendly")
+    out = session.render()
+    expected = _expected(session)
+    assert out["subject"] == expected["subject"]
+    assert out["email"] == expected["email"]
+    assert out["version"] == 0
+
+
+def test_detail_edit_returns_only_that_section():
+    session = DraftSession(BULLETS)
+    delta = session.apply([{"op": "replace", "line": 4, "text": "  - Finished module B"}])
+    assert delta == {"version": 1, "parts": {"section:Changes": session.parts["section:Changes"]}}
+    assert "I have finished the module B." in session.parts["section:Changes"]
+    assert session.render()["email"] == _expected(session)["email"]
+
+
+def test_purpose_edit_updates_subject_and_purpose():
+    session = DraftSession(BULLETS)
+    delta = session.apply([{"op": "replace", "line": 1, "text": "• Purpose: Follow-up"}])
+    assert delta["subject"] == "Follow-up"
+    assert set(delta["parts"]) == {"purpose"}
+    assert session.render()["email"] == _expected(session)["email"]
+
+
+def test_structural_edits_report_order_and_removals():
+    session = DraftSession(BULLETS)
+    delta = session.apply([{"op": "insert", "line": 6, "text": "• Risks: none"}])
+    assert delta["order"][-2] == "section:Risks"
+    delta = session.apply([{"op": "delete", "line": 5}])
+    assert delta["removed"] == ["section:Deadline"]
+    assert session.render()["email"] == _expected(session)["email"]
+
+
+def test_stale_version_and_bad_patch_leave_session_untouched():
+    session = DraftSession(BULLETS)
+    before = session.render()
+    with pytest.raises(VersionConflict):
+        session.apply([{"op": "delete", "line": 0}], version=3)
+    with pytest.raises(ValueError):
+        session.apply([{"op": "replace", "line": 4, "text": "  - x"}, {"op": "delete", "line": 99}])
+    assert session.render() == before
+
+
+def test_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    first, _ = store.create(BULLETS)
+    second, _ = store.create(BULLETS)
+    assert store.get(first) is not None
+    store.create(BULLETS)
+    assert store.get(second) is None
+    assert store.get(first) is not None
+    assert store.delete(first) and not store.delete(first)
+
+
+def test_batch_renders_sections_against_final_lines():
+    session = DraftSession("• Purpose: Follow-up")
+    delta = session.apply([
+        {"op": "insert", "line": 1, "text": "  - item"},
+        {"op": "replace", "line": 1, "text": "• Changes: x"},
+    ])
+    assert delta["version"] == 1
+    assert session.render()["email"] == _expected(session)["email"]
+
+    session = DraftSession(BULLETS)
+    delta = session.apply([
+        {"op": "insert", "line": 5, "text": "  - Wrote tests"},
+        {"op": "replace", "line": 3, "text": "  - Finished module A"},
+        {"op": "replace", "line": 1, "text": "• Purpose: Weekly sync"},
+        {"op": "delete", "line": 4},
+    ])
+    assert delta["subject"] == _expected(session)["subject"]
+    assert set(delta["parts"]) == {"purpose", "section:Changes"}
+    assert session.lines[3:5] == ["  - Finished module A", "  - Wrote tests"]
+    assert session.render()["email"] == _expected(session)["email"]
+
+
+def test_unrenderable_bullets_raise_draft_error():
+    session = DraftSession("• Purpose: Follow-up")
+    before = session.render()
+    with pytest.raises(DraftError):
+        session.apply([{"op": "insert", "line": 1, "text": "  - item"}])
+    assert session.render() == before
+    with pytest.raises(DraftError):
+        DraftSession("• Purpose: Follow-up\n  - item")
+
+
+def test_greeting_follows_the_clock(monkeypatch):
+    from datetime import datetime
+
+    import email_agent.agent as agent
+
+    class Clock(datetime):
+        hour = 9
+
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 1, 5, cls.hour)
+
+    monkeypatch.setattr(agent, "datetime", Clock)
+    session = DraftSession(BULLETS)
+    assert session.parts["greeting"].startswith("Good morning")
+    Clock.hour = 15
+    delta = session.apply([{"op": "replace", "line": 4, "text": "  - Finished module B"}])
+    assert delta["parts"]["greeting"] == "Good afternoon Taylor,"
+    Clock.hour = 20
+    assert session.render()["parts"]["greeting"] == "Good evening Taylor,"
+
+
+def test_overridden_bullets_are_not_rendered():
+    # The first Notes section alone cannot be rendered in Spanish
+    lines = ["• Notes: ", "", "  1. item 91", "• Notes: xxx…", "  * item 61"]
+    session = DraftSession("\n".join(lines), language="es")
+    assert session.render()["email"] == _expected(session)["email"]
+    session.apply([{"op": "replace", "line": 4, "text": "  * item 62"}])
+    assert session.render()["email"] == _expected(session)["email"]
+
+
+def test_patch_text_must_be_a_string():
+    session = DraftSession(BULLETS)
+    with pytest.raises(ValueError, match="must be a string"):
+        session.apply([{"op": "replace", "line": 4, "text": None}])
+    session.apply([{"op": "delete", "line": 4, "text": None}])
+    assert "None" not in session.lines
+
+
+def test_in_place_patch_does_not_copy_section_state():
+    session = DraftSession(BULLETS)
+    state = (session._starts, session._texts, session._sections, session._data, session.parts)
+    session.apply([{"op": "insert", "line": 5, "text": "  - Wrote tests"}])
+    assert all(a is b for a, b in zip(state, (session._starts, session._texts, session._sections, session._data, session.parts)))
+    assert session.render()["email"] == _expected(session)["email"]
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from email_agent import wire
+
+
+def test_json_roundtrip_preserves_unicode():
+    payload = {"subject": "Revisión", "email": "Hola Ana,\n\n— UTC−07:00"}
+    body, media = wire.encode(payload, "application/json")
+    assert media == wire.JSON
+    assert json.loads(body) == payload
+    assert wire.decode_body(body, "application/json; charset=utf-8") == payload
+
+
+def test_missing_headers_default_to_json():
+    assert wire.negotiate(None) == wire.JSON
+    assert wire.negotiate("text/html, */*") == wire.JSON
+    assert wire.decode_body(b'{"bullets": "x"}', None) == {"bullets": "x"}
+
+
+def test_unsupported_content_type():
+    with pytest.raises(wire.UnsupportedMediaType):
+        wire.decode_body(b"bullets=x", "application/x-www-form-urlencoded")
+
+
+def test_msgpack_negotiation_and_roundtrip():
+    msgpack = pytest.importorskip("msgpack")
+    payload = {"subject": "Sync", "email": "Hello,\n\nBody"}
+    body, media = wire.encode(payload, "application/msgpack, application/json")
+    assert media == wire.MSGPACK
+    assert msgpack.unpackb(body, raw=False) == payload
+    assert wire.decode_body(body, "application/x-msgpack") == payload
+    # JSON listed first wins
+    assert wire.negotiate("application/json, application/msgpack") == wire.JSON
+    # q-values outrank order
+    assert wire.negotiate("application/json;q=0.1, application/msgpack") == wire.MSGPACK
+    assert wire.negotiate("application/msgpack;q=0.5, */*") == wire.JSON
+    assert wire.negotiate("application/msgpack;q=0") == wire.JSON
@@ -0,0 +1,101 @@
+import sys
+import threading
+import types
+
+import pytest
+
+import worker
+
+
+@pytest.fixture
+def running_worker(tmp_path, monkeypatch):
+    path = str(tmp_path / "w.sock")
+    monkeypatch.setenv(worker.SOCKET_ENV, path)
+
+    def fake_draft(params):
+        if params["bullets"] == "boom":
+            raise ValueError("bad bullets")
+        subject = f"{params['tone']} {params['language']}"
+        email = f"Hello,\n\n{params['bullets']}\n\n{params['sender_name']}"
+        return {"result": {"subject": subject, "email": email}, "full_email": f"Subject: {subject}\n\n{email}"}
+
+    monkeypatch.setattr(worker, "_draft", fake_draft)
+    server = worker.make_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_shim_forwards_to_worker(running_worker, capsys):
+    result = worker.compose_email("• Purpose: Sync", sender_name="Ana", tone="friendly", language="es")
+    assert result == {"subject": "friendly es", "email": "Hello,\n\n• Purpose: Sync\n\nAna"}
+    assert capsys.readouterr().out.startswith("Subject: friendly es\n\nHello,")
+
+
+def test_worker_errors_are_raised(running_worker):
+    with pytest.raises(RuntimeError, match="bad bullets"):
+        worker.compose_email("boom")
+
+
+def test_second_worker_refuses_live_socket(running_worker):
+    with pytest.raises(RuntimeError, match="already listening"):
+        worker.make_server(running_worker)
+
+
+def test_falls_back_in_process_without_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv(worker.SOCKET_ENV, str(tmp_path / "missing.sock"))
+    calls = []
+    fake = types.SimpleNamespace(compose_email=lambda **kw: calls.append(kw) or {"subject": "S", "email": "E"})
+    monkeypatch.setitem(sys.modules, "entrypoint", fake)
+    assert worker.compose_email("• Purpose: Sync") == {"subject": "S", "email": "E"}
+    assert calls == [{"bullets": "• Purpose: Sync", "sender_name": "Your Name", "tone": "formal", "language": "en"}]
+
+
+def test_foreign_socket_is_not_used(running_worker, monkeypatch):
+    real_uid = worker.os.getuid()
+    monkeypatch.setattr(worker.os, "getuid", lambda: real_uid + 1)
+    fake = types.SimpleNamespace(compose_email=lambda **kw: {"subject": "local", "email": "E"})
+    monkeypatch.setitem(sys.modules, "entrypoint", fake)
+    assert worker.compose_email("• Purpose: Sync")["subject"] == "local"
+    with pytest.raises(RuntimeError, match="not a socket owned"):
+        worker.make_server(running_worker)
+
+
+def test_regular_file_is_not_replaced(tmp_path):
+    path = tmp_path / "w.sock"
+    path.write_text("keep me")
+    assert worker._connect(str(path)) is None
+    with pytest.raises(RuntimeError, match="not a socket owned"):
+        worker.make_server(str(path))
+    assert path.read_text() == "keep me"
+
+
+def test_default_socket_is_per_user(monkeypatch):
+    monkeypatch.delenv(worker.SOCKET_ENV, raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1234")
+    assert worker.socket_path() == "/run/user/1234/email_agent.sock"
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert worker.socket_path().endswith(f"email_agent-{worker.os.getuid()}.sock")
+
+
+
+def test_worker_declines_when_it_would_log_elsewhere(running_worker, monkeypatch, tmp_path):
+    fake = types.SimpleNamespace(compose_email=lambda **kw: {"subject": "local", "email": "E"})
+    monkeypatch.setitem(sys.modules, "entrypoint", fake)
+    assert worker.compose_email("• Purpose: Sync")["subject"] == "formal en"
+    # The worker was started without an audit dir; this caller has one
+    monkeypatch.setenv("EMAIL_AUDIT_DIR", str(tmp_path / "audit"))
+    assert worker.compose_email("• Purpose: Sync")["subject"] == "local"
+    monkeypatch.delenv("EMAIL_AUDIT_DIR")
+    monkeypatch.chdir(tmp_path)
+    assert worker.compose_email("• Purpose: Sync")["subject"] == "local"
+
+
+def test_log_target_resolves_relative_audit_dir(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EMAIL_AUDIT_DIR", "audit")
+    target = worker.log_target()
+    assert target["EMAIL_AUDIT_DIR"] == str(tmp_path / "audit")
+    assert "cwd" not in target
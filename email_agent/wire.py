@@ -0,0 +1,109 @@
+# File: email_agent/wire.py
+"""
+Wire Format Module
+
+Request decoding and response encoding for the drafting service, with
+content negotiation between JSON and MessagePack. JSON goes through orjson
+when it is installed and falls back to the standard library otherwise;
+MessagePack requires the optional `msgpack` package.
+"""
+
+import json
+from typing import Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+_MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+class UnsupportedMediaType(ValueError):
+    """Raised when a body uses a media type this service cannot decode."""
+
+
+def _media_type(header: Optional[str]) -> str:
+    return (header or "").split(";", 1)[0].strip().lower()
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_body(data: bytes, content_type: Optional[str]) -> Any:
+    """
+    Decode a request body according to its Content-Type header.
+
+    A missing Content-Type is treated as JSON.
+    """
+    media = _media_type(content_type)
+    if media in _MSGPACK_ALIASES:
+        if msgpack is None:
+            raise UnsupportedMediaType("msgpack support is not installed")
+        return msgpack.unpackb(data, raw=False)
+    if media in ("", JSON) or media.endswith("+json"):
+        return loads_json(data)
+    raise UnsupportedMediaType(f"unsupported content type: {media}")
+
+
+def _quality(part: str) -> float:
+    for param in part.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header.
+
+    MessagePack is chosen when the client accepts it (and it is available)
+    with a higher q-value than JSON, or the same q-value but listed first;
+    everything else gets JSON.
+    """
+    best, best_q = JSON, 0.0
+    for part in (accept or "").split(","):
+        media = _media_type(part)
+        if media in _MSGPACK_ALIASES and msgpack is not None:
+            candidate = MSGPACK
+        elif media in (JSON, "*/*", "application/*"):
+            candidate = JSON
+        else:
+            continue
+        q = _quality(part)
+        if q > best_q:
+            best, best_q = candidate, q
+    return best
+
+
+def encode(obj: Any, accept: Optional[str]) -> Tuple[bytes, str]:
+    """
+    Encode a response payload for the negotiated media type.
+
+    Returns (body, media_type).
+    """
+    media = negotiate(accept)
+    if media == MSGPACK:
+        return msgpack.packb(obj, use_bin_type=True), MSGPACK
+    return dumps_json(obj), JSON
@@ -1,28 +1,81 @@
 from email_agent.agent import EmailDraftingAgent
+from email_agent.audit import AuditStore
 import mlflow
+import os
 import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
+_audit_store = None
+_audit_store_lock = threading.Lock()
 
-def compose_email(
+
+def _get_audit_store():
+    """
+    Return the shared AuditStore when EMAIL_AUDIT_DIR is set, else None.
+    """
+    global _audit_store
+    root = os.environ.get("EMAIL_AUDIT_DIR")
+    if not root:
+        return None
+    with _audit_store_lock:
+        if _audit_store is None or _audit_store.root != root:
+            _audit_store = AuditStore(root)
+        return _audit_store
+
+
+@contextmanager
+def email_run() -> Iterator[None]:
+    """
+    Scope one email's MLflow logging to a run of its own.
+
+    For long-lived callers (the API and the warm worker). MLflow keeps the
+    active run per thread, so without this each pool thread would open an
+    implicit run that never ends and is reused by every email drafted on it.
+    Does nothing when the audit store is used or a run is already active.
+    """
+    if _get_audit_store() is not None or mlflow.active_run() is not None:
+        yield
+        return
+    with mlflow.start_run():
+        yield
+
+
+def draft(
     bullets: str,
     sender_name: str = "Your Name",
     tone: str = "formal",
     language: str = "en",
-) -> dict:
+) -> tuple[dict, dict]:
     """
-    Entry point for AgentOS: wraps EmailDraftingAgent, prints and logs the composed email.
+    Draft one email without logging or printing it.
 
-    Supports multilingual outputs (English and Spanish). Normalizes greetings accordingly.
+    Returns the agent's result and the timings to record with it.
     """
+    start = time.perf_counter()
     agent = EmailDraftingAgent()
     result = agent(
         bullets=bullets, sender_name=sender_name, tone=tone, language=language,
     )
+    return result, {"draft_ms": (time.perf_counter() - start) * 1000}
 
-    # Extract subject and email body from the agent's output
-    subject = result.get("subject") if isinstance(result, dict) else None
-    email_body = result.get("email") if isinstance(result, dict) else None
 
+def log_email(
+    bullets: str,
+    subject: Optional[str],
+    email_body: Optional[str],
+    sender_name: str = "Your Name",
+    tone: str = "formal",
+    language: str = "en",
+    timings: Optional[dict] = None,
+) -> str:
+    """
+    Log one email to the audit store, or to MLflow as `email.txt`.
+
+    Returns the full "Subject: ..." email text with its greeting normalized.
+    """
     # Multilingual greeting normalization
     if email_body:
         if language.lower().startswith("es"):
@@ -39,10 +92,68 @@ def compose_email(
     # Combine subject and body into full email text
     full_email = f"Subject: {subject}\n\n{email_body}"
 
+    # Append to the compact audit store if configured; otherwise log the
+    # email as a plain-text artifact in MLflow
+    store = _get_audit_store()
+    if store is not None:
+        store.append(
+            bullets,
+            subject,
+            email_body,
+            sender_name=sender_name,
+            tone=tone,
+            language=language,
+            timings=timings,
+        )
+    else:
+        mlflow.log_text(full_email, "email.txt")
+
+    return full_email
+
+
+def draft_and_log(
+    bullets: str,
+    sender_name: str = "Your Name",
+    tone: str = "formal",
+    language: str = "en",
+) -> tuple[dict, str]:
+    """
+    Draft and log one email without printing it.
+
+    Returns the agent's result and the full "Subject: ..." email text. Shared
+    by `compose_email` and the warm worker in `worker.py`.
+    """
+    result, timings = draft(
+        bullets, sender_name=sender_name, tone=tone, language=language,
+    )
+
+    # Extract subject and email body from the agent's output
+    subject = result.get("subject") if isinstance(result, dict) else None
+    email_body = result.get("email") if isinstance(result, dict) else None
+
+    full_email = log_email(
+        bullets, subject, email_body,
+        sender_name=sender_name, tone=tone, language=language, timings=timings,
+    )
+    return result, full_email
+
+
+def compose_email(
+    bullets: str,
+    sender_name: str = "Your Name",
+    tone: str = "formal",
+    language: str = "en",
+) -> dict:
+    """
+    Entry point for AgentOS: wraps EmailDraftingAgent, prints and logs the composed email.
+
+    Supports multilingual outputs (English and Spanish). Normalizes greetings accordingly.
+    """
+    result, full_email = draft_and_log(
+        bullets, sender_name=sender_name, tone=tone, language=language,
+    )
+
     # Print to console for CLI visibility
     print(full_email)
 
-    # Log the email as a plain-text artifact in MLflow
-    mlflow.log_text(full_email, "email.txt")
-
     return result
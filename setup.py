@@ -5,5 +5,14 @@ setup(
     version="0.1.0",
     packages=find_packages(),  # finds the email_agent package
     install_requires=["agentos", "mlflow",],
-    entry_points={"agentos.components": ["email_agent = entrypoint:compose_email",]},
+    extras_require={
+        # orjson encodes JSON faster; msgpack enables application/msgpack
+        "fast": ["orjson", "msgpack"],
+    },
+    entry_points={
+        "agentos.components": [
+            "email_agent = entrypoint:compose_email",
+            "email_agent_warm = worker:compose_email",
+        ]
+    },
 )
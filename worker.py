@@ -0,0 +1,221 @@
+"""
+Warm worker for the AgentOS `compose_email` component.
+
+Every `agentos run` starts a fresh interpreter and pays for imports, MLflow
+setup and agent construction before drafting a single email. Running
+
+    python worker.py [--socket PATH]
+
+keeps one interpreter warm behind a Unix socket. The `compose_email` shim in
+this module is what AgentOS calls: it forwards the parameters to the worker
+and prints the drafted email, or drafts in-process via `entrypoint` when no
+worker is listening. The shim only imports the standard library, so the
+fallback is the only path that pays the full import cost.
+
+The socket lives in $XDG_RUNTIME_DIR, or in the temp dir with the user id in
+its name, and is only used if it is a socket owned by the current user.
+Without an audit store (EMAIL_AUDIT_DIR), each request is logged in its own
+MLflow run.
+
+The worker logs with its own environment, so the shim sends where the caller
+would log (audit dir, MLflow tracking URI and experiment, and the working
+directory that relative stores resolve against). If that differs from the
+worker's, the worker declines and the shim drafts in-process instead.
+
+Protocol: one JSON object per line in each direction.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+from typing import Optional
+
+SOCKET_ENV = "EMAIL_AGENT_SOCKET"
+# Environment that decides where a draft is logged
+LOG_ENV = ("EMAIL_AUDIT_DIR", "MLFLOW_TRACKING_URI", "MLFLOW_EXPERIMENT_NAME", "MLFLOW_EXPERIMENT_ID")
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 60.0
+
+
+def socket_path() -> str:
+    """
+    $EMAIL_AGENT_SOCKET, else a per-user path: $XDG_RUNTIME_DIR/email_agent.sock
+    or <tmpdir>/email_agent-<uid>.sock.
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "email_agent.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return os.path.join(tempfile.gettempdir(), f"email_agent-{uid}.sock")
+
+
+def _owned_socket(path: str) -> bool:
+    """
+    True if `path` is a Unix socket owned by the current user.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def log_target() -> dict:
+    """
+    Where a draft made by this process would be logged.
+    """
+    target = {name: os.environ.get(name) or None for name in LOG_ENV}
+    if target["EMAIL_AUDIT_DIR"]:
+        target["EMAIL_AUDIT_DIR"] = os.path.abspath(target["EMAIL_AUDIT_DIR"])
+    else:
+        # The default MLflow store, and any relative one, live under the cwd
+        target["cwd"] = os.getcwd()
+    return target
+
+
+# Worker -------------------------------------------------------------------
+
+
+def _draft(params: dict) -> dict:
+    from entrypoint import draft_and_log, email_run
+
+    with email_run():
+        result, full_email = draft_and_log(
+            params["bullets"],
+            sender_name=params.get("sender_name", "Your Name"),
+            tone=params.get("tone", "formal"),
+            language=params.get("language", "en"),
+        )
+    return {"result": result, "full_email": full_email}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "WorkerServer"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                params = json.loads(line)
+                target = params.pop("log_target", None)
+                if target is not None and target != self.server.log_target:
+                    reply = {"ok": False, "declined": True, "error": "worker logs elsewhere"}
+                else:
+                    reply = {"ok": True, **_draft(params)}
+            except Exception as exc:
+                reply = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, handler: type):
+        super().__init__(path, handler)
+        self.log_target = log_target()
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    """
+    Connect to a listening worker, or return None if there is none.
+
+    Sockets owned by another user are never connected to.
+    """
+    if not hasattr(socket, "AF_UNIX") or not _owned_socket(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def make_server(path: Optional[str] = None) -> WorkerServer:
+    """
+    Bind the worker socket, replacing a stale socket file left by a dead worker.
+    """
+    path = path or socket_path()
+    existing = _connect(path)
+    if existing is not None:
+        existing.close()
+        raise RuntimeError(f"a worker is already listening on {path}")
+    if os.path.lexists(path):
+        if not _owned_socket(path):
+            raise RuntimeError(f"{path} exists and is not a socket owned by this user")
+        os.unlink(path)
+    server = WorkerServer(path, _Handler)
+    os.chmod(path, 0o600)
+    return server
+
+
+def serve(path: Optional[str] = None) -> None:
+    # Pay the import and MLflow setup cost once, up front
+    import entrypoint  # noqa: F401
+
+    server = make_server(path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(server.server_address):
+            os.unlink(server.server_address)
+
+
+# Client shim --------------------------------------------------------------
+
+
+def _compose_in_process(params: dict) -> dict:
+    from entrypoint import compose_email as compose_in_process
+
+    return compose_in_process(**params)
+
+
+def compose_email(
+    bullets: str,
+    sender_name: str = "Your Name",
+    tone: str = "formal",
+    language: str = "en",
+) -> dict:
+    """
+    Entry point for AgentOS: drafts via the warm worker when one is running.
+
+    Prints and returns the same output as `entrypoint.compose_email`, which it
+    falls back to when no worker is listening or the worker would log the
+    draft somewhere else than this process (see `log_target`).
+    """
+    params = {"bullets": bullets, "sender_name": sender_name, "tone": tone, "language": language}
+    sock = _connect(socket_path())
+    if sock is None:
+        return _compose_in_process(params)
+
+    with sock:
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.sendall(json.dumps({**params, "log_target": log_target()}).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as fh:
+            line = fh.readline()
+    if not line:
+        raise RuntimeError("email worker closed the connection without replying")
+    reply = json.loads(line)
+    if reply.get("declined"):
+        return _compose_in_process(params)
+    if not reply.get("ok"):
+        raise RuntimeError(f"email worker failed: {reply.get('error')}")
+    print(reply["full_email"])
+    return reply["result"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the warm email drafting worker.")
+    parser.add_argument("--socket", default=None, help=f"socket path (default: ${SOCKET_ENV}, else $XDG_RUNTIME_DIR or the temp dir)")
+    args = parser.parse_args()
+    serve(args.socket)